@@ -1,9 +1,18 @@
+import concurrent.futures
+import difflib
+import hashlib
 import itertools
+import json
+import multiprocessing
+import os
 import pathlib
 import re
+import runpy
+import shutil
 import subprocess
 import sys
 import tempfile
+import traceback
 
 import dwys
 
@@ -17,6 +26,45 @@ substitutions = {
         ", warn.conflicts = FALSE, quietly = TRUE)": ")",
         }
 
+pyin_pattern = re.compile(r"\\begin\{pyin\}\n(.*?)\\end\{pyin\}", re.DOTALL)
+pyout_pattern = re.compile(r"\\begin\{pyout\}\n(.*?)\n\\end\{pyout\}", re.DOTALL)
+Rin_pattern = re.compile(r"\\begin\{Rin\}\n(.*?)\\end\{Rin\}", re.DOTALL)
+Rout_pattern = re.compile(r"\\begin\{Rout\}\n(.*?)\n\\end\{Rout\}", re.DOTALL)
+pyexecution_command = "python"
+Rexecution_command = "Rscript"
+
+preloaded_modules = (
+    "numpy",
+    "scipy",
+    "scipy.integrate",
+    "scipy.linalg",
+    "sympy",
+    "pandas",
+    "matplotlib.pyplot",
+    "ciw",
+    "nashpy",
+    "pulp",
+)
+
+doctest_cache_directory = pathlib.Path("build/.doctest-cache")
+style_cache_directory = pathlib.Path("build/.style-cache")
+max_cache_size = 10 * 1024 * 1024
+
+# This excludes one specific lintr called 'object_usage_linter' as this is a
+# known issue with the lintr package in R.
+lintr_script = """
+linters <- lintr::default_linters[
+  names(lintr::default_linters) != 'object_usage_linter'
+]
+for (path in commandArgs(trailingOnly = TRUE)) {
+  for (lint in lintr::lint(path, linters = linters)) {
+    cat(path, lint$line_number, lint$column_number, lint$type, lint$message,
+        sep = "\\t")
+    cat("\\n")
+  }
+}
+"""
+
 
 @task
 def delenv(c):
@@ -62,6 +110,12 @@ def env(c):
     #     """Rscript -e 'remotes::install_github("dirkschumacher/ROI.plugin.cbc")'"""
     # )
 
+def get_file_hash(path):
+    """
+    Return a hash of the contents of a file.
+    """
+    return hashlib.sha256(pathlib.Path(path).read_bytes()).hexdigest()
+
 @task
 def build(c, substitutions=substitutions):
     """
@@ -72,11 +126,70 @@ def build(c, substitutions=substitutions):
 
     Should be used to carefully ensure this process has not created any unwanted
     scenarios.
+
+    All substitutions are made in a single pass over each chapter. A manifest
+    of what was copied is kept in `build/.manifest.json` so that only files
+    that have changed (in modification time and then in contents) are copied
+    again. This leaves everything else in build (including the output of
+    latexmk) untouched. Files are copied and not hard linked as LaTeX writes
+    some of its output (for example `main.pdf`) over the existing files.
     """
-    c.run("rm -rf build/")
-    c.run("cp -r src build")
-    for key, value in substitutions.items():
-        c.run(f"cd build; sed '-i.bak' 's/{key}/{value}/g' chapters/*/main.tex")
+    source = pathlib.Path("src")
+    destination = pathlib.Path("build")
+    manifest_path = destination / ".manifest.json"
+    substitutions_key = get_cache_key(*itertools.chain(*substitutions.items()))
+    substitutions_pattern = re.compile(
+        "|".join(re.escape(key) for key in substitutions)
+    )
+
+    try:
+        manifest = json.loads(manifest_path.read_text())
+    except (OSError, ValueError):
+        manifest = {}
+    if manifest.get("substitutions") != substitutions_key:
+        manifest = {}
+    files = manifest.get("files", {})
+
+    new_files = {}
+    for path in sorted(source.glob("**/*")):
+        if not path.is_file():
+            continue
+        relative_path = path.relative_to(source)
+        target = destination / relative_path
+        stat = path.stat()
+        entry = files.get(str(relative_path))
+
+        if target.exists() and entry is not None:
+            if (entry["mtime"], entry["size"]) == (stat.st_mtime_ns, stat.st_size):
+                new_files[str(relative_path)] = entry
+                continue
+
+        new_entry = {
+            "mtime": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "hash": get_file_hash(path),
+        }
+        new_files[str(relative_path)] = new_entry
+        if target.exists() and entry is not None:
+            if entry["hash"] == new_entry["hash"]:
+                continue
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if relative_path.match("chapters/*/main.tex") and len(substitutions) > 0:
+            text = path.read_text()
+            text = substitutions_pattern.sub(
+                lambda match: substitutions[match.group(0)], text
+            )
+            target.write_text(text)
+        else:
+            shutil.copy2(path, target)
+
+    for relative_path in set(files) - set(new_files):
+        (destination / relative_path).unlink(missing_ok=True)
+
+    manifest_path.write_text(
+        json.dumps({"substitutions": substitutions_key, "files": new_files})
+    )
 
 @task
 def compile(c):
@@ -111,25 +224,356 @@ def analyse(c):
         c.run(f"detex {path} | diction -s -L en_gb")
         c.run(f"detex {path} | style -L en_gb")
 
-@task
-def doctest(c, style=False, path=None):
+def get_cache_key(*parts):
+    """
+    Return a hash of all the given strings to be used as a cache key.
+    """
+    sha = hashlib.sha256()
+    for part in parts:
+        sha.update(part.encode("utf-8"))
+        sha.update(b"\0")
+    return sha.hexdigest()
+
+def read_cache(cache_directory, key):
+    """
+    Return the cached value for a given key or None if there is not one.
+
+    The modification time of the entry is updated so that `prune_cache`
+    removes the least recently used entries first.
+    """
+    cache_path = pathlib.Path(cache_directory) / f"{key}.json"
+    try:
+        value = json.loads(cache_path.read_text())
+        os.utime(cache_path)
+    except (OSError, ValueError):
+        return None
+    return value
+
+def write_cache(cache_directory, key, value):
+    """
+    Write a value to the cache.
+
+    The entry is written to a temporary file first so that jobs running in
+    parallel never read a partially written entry.
+    """
+    cache_directory = pathlib.Path(cache_directory)
+    cache_directory.mkdir(parents=True, exist_ok=True)
+    cache_path = cache_directory / f"{key}.json"
+    temporary_path = cache_directory / f"{key}.{os.getpid()}.tmp"
+    temporary_path.write_text(json.dumps(value))
+    os.replace(temporary_path, cache_path)
+
+def prune_cache(cache_directory, max_size=max_cache_size):
+    """
+    Remove the least recently used entries of the cache until its total size
+    is at most `max_size` bytes.
+    """
+    entries = []
+    for cache_path in pathlib.Path(cache_directory).glob("*.json"):
+        stat = cache_path.stat()
+        entries.append((stat.st_mtime, stat.st_size, cache_path))
+    size = sum(entry_size for _, entry_size, _ in entries)
+    for _, entry_size, cache_path in sorted(entries):
+        if size <= max_size:
+            break
+        cache_path.unlink()
+        size -= entry_size
+
+def get_interpreter_version(execution_command):
+    """
+    Return the version of a given interpreter or None if it is not available.
+
+    Note that `Rscript --version` writes to stderr.
+    """
+    try:
+        completed_process = subprocess.run(
+            [execution_command, "--version"], capture_output=True, text=True
+        )
+    except OSError:
+        return None
+    return (completed_process.stdout + completed_process.stderr).strip()
+
+def get_preload_stderr(execution_command=pyexecution_command):
+    """
+    Return what importing the preloaded modules writes to stderr in a new
+    interpreter.
+
+    Modules that are not installed are skipped, as the forkserver does when
+    preloading them.
+    """
+    code = "\n".join(
+        f"try:\n    import {module}\nexcept ImportError:\n    pass"
+        for module in preloaded_modules
+    )
+    completed_process = subprocess.run(
+        [execution_command, "-c", code], capture_output=True
+    )
+    return completed_process.stderr
+
+def get_changed_paths(ref="HEAD"):
+    """
+    Return the LaTeX documents that differ from a given git reference.
+
+    This includes documents that are not yet tracked and documents that use
+    an asset (for example `src/assets/tsp/main.py`) that differs from the
+    reference.
+    """
+    changed_files = subprocess.check_output(
+        ["git", "diff", "--name-only", ref, "--", "src"], text=True
+    ).splitlines()
+    changed_files += subprocess.check_output(
+        ["git", "ls-files", "--others", "--exclude-standard", "--", "src"],
+        text=True,
+    ).splitlines()
+    changed_files = {pathlib.Path(name) for name in changed_files}
+
+    asset_patterns = []
+    for changed_file in changed_files:
+        if changed_file.parts[:2] == ("src", "assets") and len(changed_file.parts) > 2:
+            asset = pathlib.Path(changed_file.parts[2]).stem
+            asset_patterns.append(
+                re.compile(rf"assets/{re.escape(asset)}(?=[/.}}])")
+            )
+
+    paths = []
+    for path in pathlib.Path("./src/").glob("**/*.tex"):
+        if path in changed_files or any(
+            pattern.search(path.read_text()) for pattern in asset_patterns
+        ):
+            paths.append(path)
+    return paths
+
+def write_personal_dictionary(words, dictionary_path):
+    """
+    Compile a collection of known words in to an aspell personal word list.
+    """
+    header = f"personal_ws-1.1 en {len(words)} utf-8"
+    lines = [header] + sorted(words)
+    pathlib.Path(dictionary_path).write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+def check_spelling(paths, dictionary_path):
+    """
+    Check the spelling of all given documents through a single aspell process.
+
+    aspell is run in pipe mode (`aspell -a`) and each line is sent in turn so
+    that the unknown words can be given along with their line number. The
+    words of the personal word list at `dictionary_path` are filtered by
+    aspell itself.
+
+    Returns a dictionary mapping each path to a list of pairs of line numbers
+    and unknown words.
+    """
+    aspell = subprocess.Popen(
+        [
+            "aspell",
+            "-a",
+            "-t",
+            "--lang=en_GB",
+            "--encoding=utf-8",
+            "--sug-mode=ultra",
+            f"--personal={os.path.abspath(dictionary_path)}",
+        ],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+        encoding="utf-8",
+    )
+    # Discard the version banner
+    aspell.stdout.readline()
+
+    unknown_words = {}
+    for path in paths:
+        unknown_words[path] = []
+        for line_number, line in enumerate(path.read_text().split("\n"), start=1):
+            # The `^` ensures the line is not read as an aspell command
+            aspell.stdin.write(f"^{line}\n")
+            aspell.stdin.flush()
+            # The results for a line end with an empty line
+            for result in iter(aspell.stdout.readline, "\n"):
+                if result == "":
+                    raise RuntimeError("aspell exited unexpectedly")
+                if result[0] in "&#":
+                    unknown_words[path].append((line_number, result.split()[1]))
+
+    aspell.stdin.close()
+    aspell.wait()
+    return unknown_words
+
+def run_python_in_fork(input_filename):
+    """
+    Run a python file in a forked child of the current process and return
+    what it writes to stdout and stderr.
+
+    The code is run in a fresh namespace as `__main__` so that, as long as the
+    current process has only imported modules, this is the same as running
+    `python <input_filename>` without paying the cost of those imports.
+    """
+    sys.stdout.flush()
+    sys.stderr.flush()
+    with tempfile.TemporaryFile() as stdout, tempfile.TemporaryFile() as stderr:
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 1
+            try:
+                os.dup2(stdout.fileno(), 1)
+                os.dup2(stderr.fileno(), 2)
+                sys.argv = [input_filename]
+                sys.path[0] = os.path.dirname(os.path.abspath(input_filename))
+                runpy.run_path(input_filename, run_name="__main__")
+                exit_code = 0
+            except SystemExit as exception:
+                exit_code = exception.code if isinstance(exception.code, int) else 1
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(exit_code)
+        os.waitpid(pid, 0)
+        stdout.seek(0)
+        stderr.seek(0)
+        return stdout.read(), stderr.read()
+
+def warm_diff(input_code, expected_output_code, input_filename, spacing="\n\n"):
+    """
+    Run the python input code in a forked child of the current process and
+    generate a diff with the output code.
+
+    This mirrors `dwys.diff` which runs the code with a new interpreter.
+    """
+    pathlib.Path(input_filename).write_text(spacing.join(input_code))
+    stdout, stderr = run_python_in_fork(input_filename)
+    assert stderr == b"", "Syntax error in code"
+    output = stdout.decode("utf-8").rstrip()
+
+    expected_output = "\n".join(expected_output_code)
+    return difflib.unified_diff(expected_output, output, n=2), output, expected_output
+
+def run_code(
+    path,
+    input_filename,
+    in_pattern,
+    out_pattern,
+    execution_command,
+    cache_directory=None,
+    interpreter_version=None,
+    warm=False,
+):
+    """
+    Run the code of a single LaTeX document in a single language and compare
+    it to the expected output.
+
+    This is run as a job in a separate process when doctesting with `--jobs`
+    so it returns the report to print instead of printing it, along with the
+    exit code.
+
+    If a `cache_directory` is given, passing runs are cached using a hash of
+    the input code, the expected output and the interpreter version. When
+    there is a cached pass the code is written to `input_filename` (for the
+    later style checks) but not run.
+
+    If `warm` is True the python code is run with `warm_diff` in a fork of the
+    current process instead of with a new interpreter.
+    """
+    report = []
+    text = pathlib.Path(path).read_text()
+
+    # Parse the code
+    input_code, output_code = dwys.parse(
+        string=text, in_pattern=in_pattern, out_pattern=out_pattern
+    )
+
+    use_cache = cache_directory is not None and interpreter_version is not None
+    if use_cache:
+        key = get_cache_key(
+            "\n\n".join(input_code), "\n".join(output_code), interpreter_version
+        )
+        cached = read_cache(cache_directory, key)
+        if cached is not None:
+            pathlib.Path(input_filename).write_text("\n\n".join(input_code))
+            return f"{cached['report']} (cached)", cached["exit_code"]
+
+    try:
+        if warm is True and execution_command == pyexecution_command:
+            diff, output, expected_output = warm_diff(
+                input_code=input_code,
+                expected_output_code=output_code,
+                input_filename=input_filename,
+            )
+        else:
+            diff, output, expected_output = dwys.diff(
+                input_code=input_code,
+                expected_output_code=output_code,
+                execution_command=execution_command,
+                input_filename=input_filename,
+            )
+        diff = list(diff)
+
+        try:
+            assert diff == []
+            exit_code = 0
+            report.append(f"{execution_command}: ✅")
+        except AssertionError:
+            report.append(f"{execution_command}: ❌ Input does not match output in {path}")
+            report.append(f"Obtained output:\n{output}")
+            report.append(f"Expected output:\n{expected_output}")
+            exit_code = 1
+
+    except AssertionError:
+        report.append(f"{execution_command}: ❌ Syntax error in {path}")
+        report.append(input_filename)
+        report.append(str(subprocess.check_output([execution_command, input_filename])))
+        exit_code = 1
+
+    report = "\n".join(report)
+    if use_cache and exit_code == 0:
+        write_cache(
+            cache_directory, key, {"report": report, "exit_code": exit_code}
+        )
+    return report, exit_code
+
+# `changed` comes before `cache` so that invoke gives it the short flag `-c`
+# rather than `-h`, which would hide the help of the task.
+@task(optional=["changed"])
+def doctest(
+    c, style=False, path=None, jobs=1, changed=None, cache=True, warm=False
+):
     """
     Run doctests on all LaTeX documents
 
     - Checks code gives expected output using dwys
     - Check style of python code with black
     - Check style of R code with lintr (TODO Check that this works)
+
+    Each document is run once for Python and once for R. With `--jobs` greater
+    than 1 these are run in parallel over a pool of processes. The output is
+    still printed in the same order as when they are run one at a time.
+
+    Passing runs are cached in `build/.doctest-cache` so that code that has
+    not changed since it last passed is not run again. Use `--no-cache` to run
+    all the code regardless.
+
+    Use `--changed` to only test the documents that differ from `HEAD` (or
+    from a given reference, for example `--changed=main`) along with the
+    documents that use an asset that differs from it.
+
+    Use `--warm` to run the python code in forks of long lived workers that
+    have already imported the modules used in the book (see
+    `preloaded_modules`) instead of starting a new interpreter for each
+    document. Anything written to stderr while importing those modules would
+    not be seen by the forks, so if importing them writes to stderr (for
+    example a warning) new interpreters are used instead.
     """
     max_column_length = 66
-    pyin_pattern = re.compile(r"\\begin\{pyin\}\n(.*?)\\end\{pyin\}", re.DOTALL)
-    pyout_pattern = re.compile(r"\\begin\{pyout\}\n(.*?)\n\\end\{pyout\}", re.DOTALL)
-    Rin_pattern = re.compile(r"\\begin\{Rin\}\n(.*?)\\end\{Rin\}", re.DOTALL)
-    Rout_pattern = re.compile(r"\\begin\{Rout\}\n(.*?)\n\\end\{Rout\}", re.DOTALL)
     files_to_ignore_style = ()
-    pyexecution_command = "python"
-    Rexecution_command = "Rscript"
 
-    if path is None:
+    if changed is not None:
+        ref = "HEAD" if changed is True else changed
+        paths = get_changed_paths(ref=ref)
+        if len(paths) == 0:
+            print(f"No LaTeX documents differ from {ref}")
+            sys.exit(0)
+    elif path is None:
         paths = list(pathlib.Path("./src/").glob("**/*.tex"))
     else:
         paths = [pathlib.Path(path)]
@@ -138,56 +582,77 @@ def doctest(c, style=False, path=None):
 
     exit_codes = []
     temp_files_to_ignore_style = []
+    code_jobs = []
+    if cache is True:
+        cache_directory = str(doctest_cache_directory)
+        interpreter_versions = {
+            execution_command: get_interpreter_version(execution_command)
+            for execution_command in (pyexecution_command, Rexecution_command)
+        }
+    else:
+        cache_directory = None
+        interpreter_versions = {}
+    if warm is True and get_preload_stderr() != b"":
+        print(
+            "Importing the preloaded modules writes to stderr: "
+            "running python code with new interpreters"
+        )
+        warm = False
     for i, p in enumerate(paths):
-        print(f"Testing {p}")
-        text = p.read_text()
-
-        for in_pattern, out_pattern, execution_command, input_dir in (
+        for in_pattern, out_pattern, execution_command, input_filename in (
             (
                 pyin_pattern,
                 pyout_pattern,
                 pyexecution_command,
-                dir_for_python_input_files,
+                f"{dir_for_python_input_files}/{i}.py",
+            ),
+            (
+                Rin_pattern,
+                Rout_pattern,
+                Rexecution_command,
+                f"{dir_for_R_input_files}/{i}.R",
             ),
-            (Rin_pattern, Rout_pattern, Rexecution_command, dir_for_R_input_files),
         ):
-            # Parse the code
-            input_code, output_code = dwys.parse(
-                string=text, in_pattern=in_pattern, out_pattern=out_pattern
-            )
-
-            if execution_command == "python":
-                input_filename = f"{dir_for_python_input_files}/{i}.py"
-            else:
-                input_filename = f"{dir_for_R_input_files}/{i}.R"
-
             if str(p) in files_to_ignore_style:
                 temp_files_to_ignore_style.append(input_filename)
 
-            try:
-                diff, output, expected_output = dwys.diff(
-                    input_code=input_code,
-                    expected_output_code=output_code,
-                    execution_command=execution_command,
-                    input_filename=input_filename,
+            code_jobs.append(
+                (
+                    str(p),
+                    input_filename,
+                    in_pattern,
+                    out_pattern,
+                    execution_command,
+                    cache_directory,
+                    interpreter_versions.get(execution_command),
+                    warm,
                 )
-                diff = list(diff)
-
-                try:
-                    assert diff == []
-                    exit_codes.append(0)
-                    print(f"{execution_command}: ✅")
-                except AssertionError:
-                    print(f"{execution_command}: ❌ Input does not match output in {p}")
-                    print(f"Obtained output:\n{output}")
-                    print(f"Expected output:\n{expected_output}")
-                    exit_codes.append(1)
-
-            except AssertionError:
-                print(f"{execution_command}: ❌ Syntax error in {p}")
-                print(input_filename)
-                print(subprocess.check_output([execution_command, input_filename]))
-                exit_codes.append(1)
+            )
+
+    if warm is True:
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(list(preloaded_modules))
+    else:
+        context = None
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=jobs, mp_context=context
+    ) as executor:
+        if jobs > 1 or warm is True:
+            results = executor.map(run_code, *zip(*code_jobs))
+        else:
+            results = itertools.starmap(run_code, code_jobs)
+
+        for (p, _, _, _, execution_command, *_), (report, exit_code) in zip(
+            code_jobs, results
+        ):
+            if execution_command == pyexecution_command:
+                print(f"Testing {p}")
+            print(report)
+            exit_codes.append(exit_code)
+
+    if cache is True:
+        prune_cache(cache_directory)
 
     print("Ensuring column lengths fit book")
     for path in itertools.chain(
@@ -203,24 +668,28 @@ def doctest(c, style=False, path=None):
                 exit_codes.append(1)
 
     print("Check spelling")
-    for path in paths:
-        latex = path.read_text()
-        aspell_output = subprocess.check_output(
-            ["aspell", "-t", "--list", "--lang=en_GB"], input=latex, text=True
-        )
-        incorrect_words = set(aspell_output.split("\n")) - {""} - known.words
-        if len(incorrect_words) > 0:
+    dictionary_path = pathlib.Path(tempfile.mkdtemp()) / "known.pws"
+    write_personal_dictionary(known.words, dictionary_path)
+    for path, unknown_words in check_spelling(paths, dictionary_path).items():
+        if len(unknown_words) > 0:
             print(f"In {path} the following words are not known: ")
-            for string in sorted(incorrect_words):
-                print(string)
+            line_numbers = {}
+            for line_number, string in unknown_words:
+                line_numbers.setdefault(string, []).append(str(line_number))
+            for string in sorted(line_numbers):
+                print(f"{string} (line {', '.join(line_numbers[string])})")
             exit_codes.append(1)
 
     if style is True:
         for file_path in temp_files_to_ignore_style:
             path = pathlib.Path(file_path)
             path.unlink()
-        exit_codes += check_style(dir_for_python_input_files,
-                dir_for_R_input_files, max_column_length)
+        exit_codes += check_style(
+            dir_for_python_input_files,
+            dir_for_R_input_files,
+            max_column_length,
+            cache_directory=str(style_cache_directory) if cache is True else None,
+        )
 
     exit_code = max(exit_codes)
     if exit_code == 0:
@@ -229,59 +698,136 @@ def doctest(c, style=False, path=None):
         print("❌❌❌ A test has failed. ❌❌❌")
     sys.exit(exit_code)
 
-def check_style(dir_for_python_input_files,
-        dir_for_R_input_files, max_column_length):
+def get_files_to_check(paths, tool, max_column_length, cache_directory):
+    """
+    Return the paths that are not cached as passing a given style check along
+    with the cache key of every path.
+    """
+    version = get_interpreter_version(tool)
+    keys = {
+        path: get_cache_key(tool, version or "", str(max_column_length), path.read_text())
+        for path in paths
+    }
+    if cache_directory is None or version is None:
+        return list(paths), {}
+    paths = [path for path in paths if read_cache(cache_directory, keys[path]) is None]
+    return paths, keys
+
+def cache_passing_files(paths, failing_paths, keys, cache_directory):
+    """
+    Cache all the paths that have passed a given style check.
+    """
+    if cache_directory is None:
+        return
+    for path in paths:
+        if path not in failing_paths and path in keys:
+            write_cache(cache_directory, keys[path], {"exit_code": 0})
+
+def check_style(
+    dir_for_python_input_files,
+    dir_for_R_input_files,
+    max_column_length,
+    cache_directory=None,
+):
+    """
+    Check the style of the python code with black and docformatter and of the
+    R code with lintr.
+
+    Each tool is run once over all the files: the diffs are obtained from the
+    same run as the check and all the R files are linted in a single R
+    session. If a `cache_directory` is given, files that have previously
+    passed a check (identified by a hash of their contents) are not checked
+    again.
+    """
     exit_codes = []
+    python_paths = sorted(pathlib.Path(dir_for_python_input_files).glob("*"))
+    R_paths = sorted(pathlib.Path(dir_for_R_input_files).glob("*"))
+
     print("Running black")
-    ec = subprocess.call(
-        ["black", "--check", "--diff", f"-l {max_column_length}", dir_for_python_input_files]
+    paths, keys = get_files_to_check(
+        python_paths, "black", max_column_length, cache_directory
     )
-    exit_codes.append(ec)
+    if len(paths) > 0:
+        completed_process = subprocess.run(
+            ["black", "--check", "--diff", "-l", f"{max_column_length}", *paths],
+            capture_output=True,
+            text=True,
+        )
+        print(completed_process.stdout)
+        print(completed_process.stderr)
+        failing_paths = {
+            pathlib.Path(line[len("would reformat "):].strip())
+            for line in completed_process.stderr.splitlines()
+            if line.startswith("would reformat ")
+        }
+        if completed_process.returncode in (0, 1):
+            cache_passing_files(paths, failing_paths, keys, cache_directory)
+        exit_codes.append(completed_process.returncode)
+    else:
+        print("All files have previously passed black ✅")
 
     print("Running docformatter")
-    ec = subprocess.call(
-        [
-            "docformatter",
-            "--check",
-            "--wrap-descriptions",
-            f"{max_column_length}",
-            "--wrap-summaries",
-            f"{max_column_length}",
-            "-r",
-            dir_for_python_input_files,
-        ]
+    paths, keys = get_files_to_check(
+        python_paths, "docformatter", max_column_length, cache_directory
     )
-    if ec > 0:
-        diff = subprocess.check_output(
+    if len(paths) > 0:
+        # Without `--in-place` docformatter outputs the diff of the changes it
+        # would make.
+        completed_process = subprocess.run(
             [
                 "docformatter",
                 "--wrap-descriptions",
                 f"{max_column_length}",
                 "--wrap-summaries",
                 f"{max_column_length}",
-                "-r",
-                dir_for_python_input_files,
-            ]
+                *paths,
+            ],
+            capture_output=True,
+            text=True,
         )
-        print(diff.decode("utf-8"))
+        diff = completed_process.stdout
+        failing_paths = {
+            pathlib.Path(line[len("+++ after/"):].strip())
+            for line in diff.splitlines()
+            if line.startswith("+++ after/")
+        }
+        ec = 1 if (len(diff) > 0 or completed_process.returncode > 0) else 0
+        if ec > 0:
+            print(diff)
+            print(completed_process.stderr)
+        else:
+            print("Docstrings follow PEP 257 ✅")
+        if completed_process.returncode == 0 or len(failing_paths) > 0:
+            cache_passing_files(paths, failing_paths, keys, cache_directory)
+        exit_codes.append(ec)
     else:
-        print("Docstrings follow PEP 257 ✅")
-    exit_codes.append(min(ec, 1))
+        print("All files have previously passed docformatter ✅")
 
     print("Running lintr")
-    # This excludes one specific lintr called 'object_usage_linter' as this is a
-    # known issue with the lintr package in R.
-    for path in pathlib.Path(dir_for_R_input_files).glob("*"):
+    paths, keys = get_files_to_check(
+        R_paths, "Rscript", max_column_length, cache_directory
+    )
+    if len(paths) > 0:
         output = subprocess.check_output(
-            [
-                "Rscript",
-                "-e",
-                f"lintr::lint('{path}', linters=lintr::default_linters[names(lintr::default_linters) != 'object_usage_linter'])",
-            ]
+            ["Rscript", "-e", lintr_script, *paths], text=True
         )
-        if len(output) > 0:
-            print(output.decode("utf-8"))
+        lints = {}
+        for line in output.splitlines():
+            path, line_number, column_number, lint_type, message = line.split(
+                "\t", maxsplit=4
+            )
+            lints.setdefault(pathlib.Path(path), []).append(
+                f"{path}:{line_number}:{column_number}: {lint_type}: {message}"
+            )
+        for path in lints:
+            print("\n".join(lints[path]))
             exit_codes.append(1)
+        cache_passing_files(paths, lints, keys, cache_directory)
+    else:
+        print("All files have previously passed lintr ✅")
+
+    if cache_directory is not None:
+        prune_cache(cache_directory)
     return exit_codes
 
 @task